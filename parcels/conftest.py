@@ -0,0 +1,69 @@
+"""
+Shared fixtures for the Parcel Management Service API tests.
+"""
+
+import hashlib
+import uuid
+
+import pytest
+from fastapi.testclient import TestClient
+
+from main import app, get_registry
+from services import RouterStubClient
+from storage import ParcelRegistry
+
+
+@pytest.fixture(scope="session")
+def client():
+    """
+    One test client for the whole session; state lives in the registry.
+    Entered as a context manager so the app lifespan runs once, not per request.
+    """
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture
+def registry():
+    """Serve a test from a fresh in-memory registry backed by the stub router."""
+    registry = ParcelRegistry(RouterStubClient())
+    app.dependency_overrides[get_registry] = lambda: registry
+    yield registry
+    app.dependency_overrides.clear()
+
+
+def generate_parcel_id():
+    """Generate a UUID and its hash for testing."""
+    private_id = str(uuid.uuid4())
+    public_id = hashlib.sha256(private_id.encode()).hexdigest()
+    return private_id, public_id
+
+
+@pytest.fixture
+def parcel_id():
+    """A fresh (private_id, public_id) pair for a parcel that is not registered."""
+    return generate_parcel_id()
+
+
+@pytest.fixture
+def register_parcel(client, registry):
+    """
+    Register a parcel from CityA and return its (private_id, public_id).
+    CityB is one leg away (leg-001), CityC two (leg-003, leg-004).
+    """
+    def register(to_location="CityB"):
+        private_id, public_id = generate_parcel_id()
+        response = client.post("/register", json={
+            "from": "CityA",
+            "to": to_location,
+            "publicId": public_id,
+            "width": 10,
+            "height": 10,
+            "length": 20,
+            "weight": 5,
+            "items": [{"name": "Item", "value": 1000}]
+        })
+        assert response.status_code == 200
+        return private_id, public_id
+
+    return register
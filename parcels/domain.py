@@ -2,49 +2,73 @@
 Domain entities for the Parcel Management Service.
 """
 
+import sys
 import time
 from dataclasses import dataclass, field
-from abc import ABC
-from typing import List
+from typing import ClassVar, List, Optional, Tuple
 
 
-@dataclass(frozen=True)
+# Event kinds tracked by ParcelHistory to derive parcel state without rescanning
+NO_EVENT = 0
+DEPARTURE = 1
+ARRIVAL = 2
+PICKUP = 3
+
+
+def current_timestamp() -> int:
+    """Return the current Unix epoch time in whole seconds."""
+    return time.time_ns() // 1_000_000_000
+
+
+@dataclass(frozen=True, slots=True)
 class Item:
     """Represents an item in a parcel."""
     name: str
     value: int
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class Route:
     """Represents a delivery route with pre-calculated cost and time."""
-    leg_ids: List[str]  # Opaque leg identifiers from Router service
+    leg_ids: Tuple[str, ...]  # Opaque leg identifiers from Router service
     cost: int  # Total cost from Router
     time: int  # Total time from Router
 
+    def __post_init__(self) -> None:
+        # Interned IDs let the /take leg check compare by identity
+        object.__setattr__(self, "leg_ids", tuple(map(sys.intern, self.leg_ids)))
+
 
-@dataclass(frozen=True)
-class ParcelEvent(ABC):
+@dataclass(frozen=True, slots=True)
+class ParcelEvent:
     """Base class for parcel events."""
+    kind: ClassVar[int] = NO_EVENT  # Discriminator, compared instead of isinstance()
     timestamp: int  # Unix epoch timestamp
+    message: str = field(init=False, repr=False, compare=False)  # Cached to_message()
+
+    def __post_init__(self) -> None:
+        # Events are immutable, so the message is formatted once at creation
+        object.__setattr__(self, "message", self.to_message())
 
     def to_message(self) -> str:
         """Convert event to human-readable message."""
         raise NotImplementedError("Subclasses must implement to_message()")
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class PickupEvent(ParcelEvent):
     """Event recorded when parcel is picked up at final destination."""
+    kind: ClassVar[int] = PICKUP
 
     def to_message(self) -> str:
         """Convert event to human-readable message."""
         return "Parcel picked up at final destination"
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class ArrivalEvent(ParcelEvent):
     """Event recorded when parcel arrives at a location."""
+    kind: ClassVar[int] = ARRIVAL
     to: str  # Arrival location
 
     def to_message(self) -> str:
@@ -52,9 +76,10 @@ class ArrivalEvent(ParcelEvent):
         return f"Arrived at {self.to}"
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class DepartureEvent(ParcelEvent):
     """Event recorded when parcel departs on a leg."""
+    kind: ClassVar[int] = DEPARTURE
     leg_id: str  # Opaque leg identifier
 
     def to_message(self) -> str:
@@ -62,28 +87,55 @@ class DepartureEvent(ParcelEvent):
         return f"Departed via {self.leg_id}"
 
 
-@dataclass
+@dataclass(slots=True)
 class ParcelHistory:
-    """Maintains ordered list of events for a parcel."""
-    events: List[ParcelEvent] = field(default_factory=list)
-
-    def departure(self, leg_id: str) -> None:
+    """
+    Maintains the ordered event history for a parcel.
+    Events are kept only as their /track-ready {"timestamp", "message"} dicts;
+    the state lookups read the counters below, not the events themselves.
+    """
+    entries: List[dict] = field(default_factory=list, init=False)
+    # Maintained incrementally so state lookups don't rescan the history
+    _departure_count: int = field(default=0, init=False, repr=False)
+    _last_kind: int = field(default=NO_EVENT, init=False, repr=False)
+
+    @property
+    def departure_count(self) -> int:
+        """Number of departures recorded, i.e. the number of legs started."""
+        return self._departure_count
+
+    @property
+    def last_kind(self) -> int:
+        """Kind of the most recent event, or NO_EVENT for an empty history."""
+        return self._last_kind
+
+    def departure(self, leg_id: str, timestamp: Optional[int] = None) -> None:
         """Record a departure event for a specific leg."""
-        event = DepartureEvent(timestamp=int(time.time()), leg_id=leg_id)
-        self.events.append(event)
+        if timestamp is None:
+            timestamp = current_timestamp()
+        self._record(DepartureEvent(timestamp=timestamp, leg_id=leg_id))
 
-    def arrival(self, location: str) -> None:
+    def arrival(self, location: str, timestamp: Optional[int] = None) -> None:
         """Record an arrival event at a location."""
-        event = ArrivalEvent(timestamp=int(time.time()), to=location)
-        self.events.append(event)
+        if timestamp is None:
+            timestamp = current_timestamp()
+        self._record(ArrivalEvent(timestamp=timestamp, to=location))
 
-    def pickup(self) -> None:
+    def pickup(self, timestamp: Optional[int] = None) -> None:
         """Record a pickup event at final destination."""
-        event = PickupEvent(timestamp=int(time.time()))
-        self.events.append(event)
+        if timestamp is None:
+            timestamp = current_timestamp()
+        self._record(PickupEvent(timestamp=timestamp))
+
+    def _record(self, event: ParcelEvent) -> None:
+        """Append an event's history entry and update the derived state counters."""
+        self.entries.append({"timestamp": event.timestamp, "message": event.message})
+        self._last_kind = event.kind
+        if event.kind == DEPARTURE:
+            self._departure_count += 1
 
 
-@dataclass
+@dataclass(slots=True)
 class Parcel:
     """
     Represents a parcel in the delivery system.
@@ -96,6 +148,7 @@ class Parcel:
     weight: int
     items: List[Item]
     route: Route
+    total_stops: int  # Number of legs in the route, fixed at registration
     history: ParcelHistory
 
     def get_next_leg_id(self) -> str | None:
@@ -103,22 +156,14 @@ class Parcel:
         Determine the next expected leg based on history.
         Returns None if parcel is in transit or has completed all legs.
         """
-        print(f"Getting on of legs {self.route.leg_ids}")
         # If last event is a departure, parcel is currently in transit
-        if self.history.events and isinstance(self.history.events[-1], DepartureEvent):
-            print(f"Parcel is in transit")
+        if self.history.last_kind == DEPARTURE:
             return None
 
-        # Count departure events to determine current leg index
-        departure_count = sum(
-            1 for event in self.history.events
-            if isinstance(event, DepartureEvent)
-        )
-        print(f"Parcel departed {departure_count} times")
+        # Each departure completes one leg, so the count is the current leg index
+        departure_count = self.history.departure_count
 
         # Check if all legs have been completed
-        if departure_count >= len(self.route.leg_ids):
-            print(f"Parcel arrived at destination")
+        if departure_count >= self.total_stops:
             return None
-        print(f"Parcel is ready to travel via {self.route.leg_ids[departure_count]}")
         return self.route.leg_ids[departure_count]
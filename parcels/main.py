@@ -4,26 +4,47 @@ Implements 6 endpoints (no /route endpoint - that's Router service's responsibil
 Matches the OpenAPI specification in context/openapi.yaml
 """
 
-import hashlib
-from fastapi import FastAPI, HTTPException
-from typing import List
+import sys
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from hashlib import sha256
+from fastapi import APIRouter, Depends, FastAPI, HTTPException, Request
+from fastapi.exceptions import RequestValidationError
+from fastapi.openapi.constants import REF_PREFIX, REF_TEMPLATE
+from fastapi.openapi.utils import (
+    get_openapi, validation_error_definition, validation_error_response_definition
+)
+from typing import Any, List
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel, ValidationError
+from pydantic.json_schema import models_json_schema
 
 from models import (
     ParcelCreationInfo, DeliveryInfo, PickupInput, GetDeliveryStatusInput,
-    ParcelStatusHistory, HistoryEntry, ParcelList,
+    ParcelStatusHistory, ParcelList,
     TakeParcelInput, PutParcelInput
 )
-from domain import Item
+from domain import Item, Parcel
 from storage import ParcelRegistry
 from services import RouterClient
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Release the Router connection pool when the server shuts down."""
+    yield
+    if _create_router_client.cache_info().currsize:
+        await _create_router_client().aclose()
+
+
 # Initialize FastAPI app
 app = FastAPI(
     title="Parcel Management Service",
     version="1.0.0",
-    description="Microservice for managing parcel delivery lifecycle"
+    description="Microservice for managing parcel delivery lifecycle",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan
 )
 
 origins = ["*"]
@@ -36,9 +57,105 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize services
-router_client = RouterClient()
-registry = ParcelRegistry(router_client)
+# The spec endpoints that never answer 404; parcel_lookup_api below holds the
+# rest. Both are registered on the app at the bottom
+parcel_api = APIRouter()
+
+
+@lru_cache(maxsize=1)
+def _create_router_client() -> RouterClient:
+    """Process-wide Router client, created on first use."""
+    return RouterClient()
+
+
+@lru_cache(maxsize=1)
+def _create_registry() -> ParcelRegistry:
+    """Process-wide parcel registry, created on first use."""
+    return ParcelRegistry(_create_router_client())
+
+
+async def get_registry() -> ParcelRegistry:
+    """
+    Dependency providing the parcel registry.
+    Async so FastAPI resolves it on the event loop rather than the threadpool;
+    tests swap in their own registry via app.dependency_overrides.
+    """
+    return _create_registry()
+
+
+# Error details shared by the handlers and the documentation examples
+_ERR_NO_ROUTE = "No valid route found for the given origin and destination"
+_ERR_PARCEL_NOT_FOUND = "Parcel not found"
+_ERR_LEG_MISMATCH_TMPL = "Leg {} does not match the next expected leg for this parcel"
+
+
+def _hash_private_id(private_id: str) -> str:
+    """
+    Derive a parcel's public ID (SHA-256 hex digest) from its private ID.
+    The frontend computes the same digest at registration, so the hash
+    function is part of the API contract.
+    """
+    return sha256(private_id.encode()).hexdigest()
+
+
+def _get_parcel_or_404(registry: ParcelRegistry, public_id: str) -> Parcel:
+    """Look up a parcel by public ID, raising 404 if it is not registered."""
+    parcel = registry.find_by_id(public_id)
+    if parcel is None:
+        raise HTTPException(status_code=404, detail=_ERR_PARCEL_NOT_FOUND)
+    return parcel
+
+
+def _json_body(model: type[BaseModel]) -> Any:
+    """
+    Dependency that validates the raw request body against a request model.
+    pydantic-core parses and validates the JSON bytes in a single pass,
+    instead of FastAPI's json.loads followed by model validation.
+    """
+    async def parse(request: Request):
+        try:
+            return model.model_validate_json(await request.body())
+        except ValidationError as exc:
+            # Same shape as FastAPI's own 422 errors for declared bodies; the
+            # input is left out since it may be raw, non-UTF-8 body bytes
+            errors = exc.errors(include_url=False, include_input=False)
+            raise RequestValidationError(
+                [{**error, "loc": ("body", *error["loc"])} for error in errors]
+            ) from None
+
+    return Depends(parse)
+
+
+# Request models read by _json_body(); _openapi() adds them to components
+_JSON_BODY_MODELS: dict[str, type[BaseModel]] = {}
+
+
+def _json_body_openapi(model: type[BaseModel]) -> dict:
+    """
+    OpenAPI requestBody and 422 entries for an endpoint that uses _json_body().
+    FastAPI documents declared bodies itself; these mirror what it would emit.
+    """
+    _JSON_BODY_MODELS[model.__name__] = model
+    return {
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/json": {
+                    "schema": {"$ref": f"{REF_PREFIX}{model.__name__}"}
+                }
+            }
+        },
+        "responses": {
+            "422": {
+                "description": "Validation Error",
+                "content": {
+                    "application/json": {
+                        "schema": {"$ref": f"{REF_PREFIX}HTTPValidationError"}
+                    }
+                }
+            }
+        }
+    }
 
 
 # Error response examples for documentation
@@ -47,7 +164,7 @@ ERROR_RESPONSES = {
         "description": "Bad Request",
         "content": {
             "application/json": {
-                "example": {"detail": "No valid route found for the given origin and destination"}
+                "example": {"detail": _ERR_NO_ROUTE}
             }
         }
     },
@@ -55,22 +172,29 @@ ERROR_RESPONSES = {
         "description": "Not Found",
         "content": {
             "application/json": {
-                "example": {"detail": "Parcel not found"}
+                "example": {"detail": _ERR_PARCEL_NOT_FOUND}
             }
         }
     }
 }
 
+# Spec endpoints that look a parcel up by ID and answer 404 when it is unknown
+parcel_lookup_api = APIRouter(responses={404: ERROR_RESPONSES[404]})
 
-@app.post(
+
+@parcel_api.post(
     "/register",
-    response_model=DeliveryInfo,
     status_code=200,
     responses={
+        200: {"model": DeliveryInfo},
         400: ERROR_RESPONSES[400]
-    }
+    },
+    openapi_extra=_json_body_openapi(ParcelCreationInfo)
 )
-def register_parcel(parcel_info: ParcelCreationInfo):
+async def register_parcel(
+    parcel_info: ParcelCreationInfo = _json_body(ParcelCreationInfo),
+    registry: ParcelRegistry = Depends(get_registry)
+):
     """
     Register a new parcel for delivery.
 
@@ -81,11 +205,11 @@ def register_parcel(parcel_info: ParcelCreationInfo):
     **Error Responses:**
     - **400 Bad Request**: No valid route found for the given origin and destination
     """
-    # Convert ItemInfo to Item domain objects
-    items = [Item(name=item.name, value=item.value) for item in parcel_info.items]
+    # Convert ItemInfo to Item domain objects (positional args skip kwarg matching)
+    items = [Item(item.name, item.value) for item in parcel_info.items]
 
     # Register parcel via registry using the provided publicId
-    result = registry.register_parcel(
+    result = await registry.register_parcel(
         public_id=parcel_info.publicId,
         from_location=parcel_info.from_location,
         to_location=parcel_info.to_location,
@@ -97,28 +221,26 @@ def register_parcel(parcel_info: ParcelCreationInfo):
     )
 
     if result is None:
-        raise HTTPException(
-            status_code=400,
-            detail="No valid route found for the given origin and destination"
-        )
+        raise HTTPException(status_code=400, detail=_ERR_NO_ROUTE)
 
     cost, time = result
 
-    return DeliveryInfo(
-        cost=cost,
-        time=time
-    )
+    # Built from trusted values, so skip DeliveryInfo revalidation
+    return ORJSONResponse({"cost": cost, "time": time})
 
 
-@app.post(
+@parcel_lookup_api.post(
     "/pickup",
-    response_model=bool,
     status_code=200,
     responses={
-        404: ERROR_RESPONSES[404]
-    }
+        200: {"model": bool}
+    },
+    openapi_extra=_json_body_openapi(PickupInput)
 )
-def pickup_parcel(pickup_input: PickupInput):
+async def pickup_parcel(
+    pickup_input: PickupInput = _json_body(PickupInput),
+    registry: ParcelRegistry = Depends(get_registry)
+):
     """
     Record that a parcel has been picked up at its final destination.
 
@@ -128,25 +250,25 @@ def pickup_parcel(pickup_input: PickupInput):
     - **404 Not Found**: Parcel not found
     """
     # Hash the private ID to get the public ID for lookup
-    public_id = hashlib.sha256(pickup_input.privateParcelId.encode()).hexdigest()
-    parcel = registry.find_by_id(public_id)
+    public_id = _hash_private_id(pickup_input.privateParcelId)
+    parcel = _get_parcel_or_404(registry, public_id)
 
-    if parcel is None:
-        raise HTTPException(status_code=404, detail="Parcel not found")
-
-    parcel.history.pickup()
-    return True
+    registry.record_pickup(parcel)
+    return ORJSONResponse(True)
 
 
-@app.post(
+@parcel_lookup_api.post(
     "/track",
-    response_model=ParcelStatusHistory,
     status_code=200,
     responses={
-        404: ERROR_RESPONSES[404]
-    }
+        200: {"model": ParcelStatusHistory}
+    },
+    openapi_extra=_json_body_openapi(GetDeliveryStatusInput)
 )
-def track_parcel(track_input: GetDeliveryStatusInput):
+async def track_parcel(
+    track_input: GetDeliveryStatusInput = _json_body(GetDeliveryStatusInput),
+    registry: ParcelRegistry = Depends(get_registry)
+):
     """
     Get tracking history and status for a parcel.
 
@@ -158,42 +280,34 @@ def track_parcel(track_input: GetDeliveryStatusInput):
     - **404 Not Found**: Parcel not found
     """
     # Hash the private ID to get the public ID for lookup
-    public_id = hashlib.sha256(track_input.privateParcelId.encode()).hexdigest()
-    parcel = registry.find_by_id(public_id)
-
-    if parcel is None:
-        raise HTTPException(status_code=404, detail="Parcel not found")
-
-    # Convert events to human-readable messages using event.to_message()
-    history_entries = [
-        HistoryEntry(timestamp=event.timestamp, message=event.to_message())
-        for event in parcel.history.events
-    ]
-
-    total_stops = len(parcel.route.leg_ids)
+    public_id = _hash_private_id(track_input.privateParcelId)
+    parcel = _get_parcel_or_404(registry, public_id)
 
-    return ParcelStatusHistory(
-        totalStops=total_stops,
-        history=history_entries
-    )
+    # History entries are built once per event when it is recorded and
+    # serialized straight to JSON (ParcelStatusHistory shape), bypassing
+    # model validation and FastAPI's jsonable_encoder pass.
+    return ORJSONResponse({
+        "totalStops": parcel.total_stops,
+        "history": parcel.history.entries
+    })
 
 
-@app.get("/parcels/{legId}", response_model=ParcelList, status_code=200)
-def get_parcels_for_leg(legId: str):
+@parcel_api.get("/parcels/{legId}", status_code=200, responses={200: {"model": ParcelList}})
+async def get_parcels_for_leg(legId: str, registry: ParcelRegistry = Depends(get_registry)):
     """
     Get list of parcels awaiting transport for a specific leg.
     Returns list of parcel IDs (pickup_id_hash values).
     """
     parcel_ids = registry.get_parcels_for_leg(legId)
 
-    return ParcelList(parcelIds=parcel_ids)
+    return ORJSONResponse({"parcelIds": parcel_ids})
 
 
-@app.post(
+@parcel_lookup_api.post(
     "/take/{parcelId}",
-    response_model=bool,
     status_code=200,
     responses={
+        200: {"model": bool},
         400: {
             "description": "Bad Request",
             "content": {
@@ -201,11 +315,15 @@ def get_parcels_for_leg(legId: str):
                     "example": {"detail": "Leg does not match the next expected leg for this parcel"}
                 }
             }
-        },
-        404: ERROR_RESPONSES[404]
-    }
+        }
+    },
+    openapi_extra=_json_body_openapi(TakeParcelInput)
 )
-def take_parcel(parcelId: str, take_input: TakeParcelInput):
+async def take_parcel(
+    parcelId: str,
+    take_input: TakeParcelInput = _json_body(TakeParcelInput),
+    registry: ParcelRegistry = Depends(get_registry)
+):
     """
     Record that a parcel is departing on a specific leg.
 
@@ -213,49 +331,83 @@ def take_parcel(parcelId: str, take_input: TakeParcelInput):
     - **400 Bad Request**: Leg ID does not match the next expected leg for this parcel
     - **404 Not Found**: Parcel not found
     """
-    parcel = registry.find_by_id(parcelId)
+    parcel = _get_parcel_or_404(registry, parcelId)
 
-    if parcel is None:
-        raise HTTPException(status_code=404, detail="Parcel not found")
+    # Route leg IDs are interned, so a matching leg compares by identity
+    leg_id = sys.intern(take_input.leg.id)
 
     # Validate that leg_id matches the next expected leg
     expected_leg_id = parcel.get_next_leg_id()
-    if expected_leg_id != take_input.leg.id:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Leg {take_input.leg.id} does not match the next expected leg for this parcel"
-        )
+    if expected_leg_id != leg_id:
+        raise HTTPException(status_code=400, detail=_ERR_LEG_MISMATCH_TMPL.format(leg_id))
 
-    parcel.history.departure(take_input.leg.id)
-    return True
+    registry.record_departure(parcel, leg_id)
+    return ORJSONResponse(True)
 
 
-@app.post(
+@parcel_lookup_api.post(
     "/put/{parcelId}",
-    response_model=bool,
     status_code=200,
     responses={
-        404: ERROR_RESPONSES[404]
-    }
+        200: {"model": bool}
+    },
+    openapi_extra=_json_body_openapi(PutParcelInput)
 )
-def put_parcel(parcelId: str, put_input: PutParcelInput):
+async def put_parcel(
+    parcelId: str,
+    put_input: PutParcelInput = _json_body(PutParcelInput),
+    registry: ParcelRegistry = Depends(get_registry)
+):
     """
     Record that a parcel has arrived at a location.
 
     **Error Responses:**
     - **404 Not Found**: Parcel not found
     """
-    parcel = registry.find_by_id(parcelId)
+    parcel = _get_parcel_or_404(registry, parcelId)
+
+    registry.record_arrival(parcel, sys.intern(put_input.location))
+    return ORJSONResponse(True)
+
+
+app.include_router(parcel_api)
+app.include_router(parcel_lookup_api)
+
+
+def _openapi() -> dict:
+    """
+    FastAPI's generated schema plus the components it cannot see: the
+    request models read by _json_body() and the validation error models.
+    """
+    if app.openapi_schema:
+        return app.openapi_schema
+
+    schema = get_openapi(
+        title=app.title,
+        version=app.version,
+        openapi_version=app.openapi_version,
+        description=app.description,
+        routes=app.routes
+    )
+    _, body_schemas = models_json_schema(
+        [(model, "validation") for model in _JSON_BODY_MODELS.values()],
+        ref_template=REF_TEMPLATE
+    )
+    components = schema.setdefault("components", {}).setdefault("schemas", {})
+    components.update(body_schemas.get("$defs", {}))
+    components.setdefault("ValidationError", validation_error_definition)
+    components.setdefault("HTTPValidationError", validation_error_response_definition)
+    schema["components"]["schemas"] = dict(sorted(components.items()))
+
+    app.openapi_schema = schema
+    return app.openapi_schema
 
-    if parcel is None:
-        raise HTTPException(status_code=404, detail="Parcel not found")
 
-    parcel.history.arrival(put_input.location)
-    return True
+app.openapi = _openapi
 
 
 # Health check endpoint (bonus - not in spec but useful)
 @app.get("/health", status_code=200)
-def health_check():
+async def health_check():
     """Simple health check endpoint."""
     return {"status": "healthy"}
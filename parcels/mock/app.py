@@ -3,9 +3,10 @@ Mock Flask application for Parcel Management Service.
 Implements the same endpoints as the FastAPI service but with simple mock responses.
 """
 
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request
 from flask_cors import CORS
-import hashlib
+from hashlib import sha256
+import orjson
 import time
 
 app = Flask(__name__)
@@ -13,8 +14,40 @@ CORS(app)  # Enable CORS for all routes
 
 # In-memory storage for mock parcels
 parcels_db = {}
+# leg_id -> {parcel_id: None}; inner dicts act as insertion-ordered sets
 parcels_by_leg = {}
 
+_REQUIRED_FIELDS = frozenset(
+    ('publicId', 'from', 'to', 'length', 'width', 'height', 'weight', 'items')
+)
+
+
+def clear_storage():
+    """Empty the in-memory storage in place (module-level references stay valid)."""
+    parcels_db.clear()
+    parcels_by_leg.clear()
+
+
+def _ojson(obj, status=200):
+    """Serialize a JSON response with orjson instead of Flask's jsonify."""
+    return Response(orjson.dumps(obj), status=status, mimetype='application/json')
+
+
+def _now():
+    """Current Unix time in whole seconds, without a float round-trip."""
+    return time.time_ns() // 1_000_000_000
+
+
+def _add_history(parcel, message):
+    """Append a history entry and drop the parcel's cached /track payload."""
+    parcel['history'].append({'timestamp': _now(), 'message': message})
+    parcel['track_json'] = None
+
+
+def _public_id(private_id):
+    """Derive the public ID from a private one; must match the frontend's SHA-256."""
+    return sha256(private_id.encode()).hexdigest()
+
 
 @app.route('/register', methods=['POST'])
 def register_parcel():
@@ -25,9 +58,9 @@ def register_parcel():
     data = request.get_json()
 
     # Validate required fields
-    required_fields = ['publicId', 'from', 'to', 'length', 'width', 'height', 'weight', 'items']
-    if not all(field in data for field in required_fields):
-        return jsonify({"detail": "Missing required fields"}), 400
+    missing = _REQUIRED_FIELDS.difference(data)
+    if missing:
+        return _ojson({"detail": f"Missing required fields: {', '.join(sorted(missing))}"}, 400)
 
     # Store the parcel with mock data
     public_id = data['publicId']
@@ -43,19 +76,20 @@ def register_parcel():
         'items': data['items'],
         'history': [
             {
-                'timestamp': int(time.time()),
+                'timestamp': _now(),
                 'message': f"Parcel registered for delivery from {data['from']} to {data['to']}"
             }
         ],
         'current_leg_index': 0,
-        'total_stops': 3  # Mock value
+        'total_stops': 3,  # Mock value
+        'track_json': None  # Serialized /track body, rebuilt after history changes
     }
 
     # Return mock cost and time
-    return jsonify({
+    return _ojson({
         "cost": 1500,  # Mock cost in cents
         "time": 7200   # Mock time in seconds (2 hours)
-    }), 200
+    })
 
 
 @app.route('/pickup', methods=['POST'])
@@ -66,21 +100,18 @@ def pickup_parcel():
     data = request.get_json()
 
     if 'privateParcelId' not in data:
-        return jsonify({"detail": "Missing privateParcelId"}), 400
+        return _ojson({"detail": "Missing privateParcelId"}, 400)
 
     # Hash the private ID to get the public ID
-    public_id = hashlib.sha256(data['privateParcelId'].encode()).hexdigest()
+    public_id = _public_id(data['privateParcelId'])
 
     if public_id not in parcels_db:
-        return jsonify({"detail": "Parcel not found"}), 404
+        return _ojson({"detail": "Parcel not found"}, 404)
 
     # Add pickup event to history
-    parcels_db[public_id]['history'].append({
-        'timestamp': int(time.time()),
-        'message': "Parcel picked up by recipient"
-    })
+    _add_history(parcels_db[public_id], "Parcel picked up by recipient")
 
-    return jsonify(True), 200
+    return _ojson(True)
 
 
 @app.route('/track', methods=['POST'])
@@ -91,20 +122,25 @@ def track_parcel():
     data = request.get_json()
 
     if 'privateParcelId' not in data:
-        return jsonify({"detail": "Missing privateParcelId"}), 400
+        return _ojson({"detail": "Missing privateParcelId"}, 400)
 
     # Hash the private ID to get the public ID
-    public_id = hashlib.sha256(data['privateParcelId'].encode()).hexdigest()
+    public_id = _public_id(data['privateParcelId'])
 
     if public_id not in parcels_db:
-        return jsonify({"detail": "Parcel not found"}), 404
+        return _ojson({"detail": "Parcel not found"}, 404)
 
     parcel = parcels_db[public_id]
 
-    return jsonify({
-        "totalStops": parcel['total_stops'],
-        "history": parcel['history']
-    }), 200
+    # Repeat polls of an unchanged parcel reuse the serialized body
+    body = parcel['track_json']
+    if body is None:
+        body = parcel['track_json'] = orjson.dumps({
+            "totalStops": parcel['total_stops'],
+            "history": parcel['history']
+        })
+
+    return Response(body, mimetype='application/json')
 
 
 @app.route('/parcels/<leg_id>', methods=['GET'])
@@ -112,11 +148,11 @@ def get_parcels_for_leg(leg_id):
     """
     Get list of parcels awaiting transport for a specific leg.
     """
-    parcel_ids = parcels_by_leg.get(leg_id, [])
+    parcel_ids = list(parcels_by_leg.get(leg_id, ()))
 
-    return jsonify({
+    return _ojson({
         "parcelIds": parcel_ids
-    }), 200
+    })
 
 
 @app.route('/take/<parcel_id>', methods=['POST'])
@@ -127,24 +163,22 @@ def take_parcel(parcel_id):
     data = request.get_json()
 
     if 'leg' not in data or 'id' not in data['leg']:
-        return jsonify({"detail": "Missing leg id"}), 400
+        return _ojson({"detail": "Missing leg id"}, 400)
 
     if parcel_id not in parcels_db:
-        return jsonify({"detail": "Parcel not found"}), 404
+        return _ojson({"detail": "Parcel not found"}, 404)
 
     leg_id = data['leg']['id']
 
     # Add departure event to history
-    parcels_db[parcel_id]['history'].append({
-        'timestamp': int(time.time()),
-        'message': f"Parcel departed on leg {leg_id}"
-    })
+    _add_history(parcels_db[parcel_id], f"Parcel departed on leg {leg_id}")
 
     # Remove from current leg's waiting list
-    if leg_id in parcels_by_leg and parcel_id in parcels_by_leg[leg_id]:
-        parcels_by_leg[leg_id].remove(parcel_id)
+    waiting = parcels_by_leg.get(leg_id)
+    if waiting is not None:
+        waiting.pop(parcel_id, None)
 
-    return jsonify(True), 200
+    return _ojson(True)
 
 
 @app.route('/put/<parcel_id>', methods=['POST'])
@@ -155,30 +189,23 @@ def put_parcel(parcel_id):
     data = request.get_json()
 
     if 'location' not in data:
-        return jsonify({"detail": "Missing location"}), 400
+        return _ojson({"detail": "Missing location"}, 400)
 
     if parcel_id not in parcels_db:
-        return jsonify({"detail": "Parcel not found"}), 404
+        return _ojson({"detail": "Parcel not found"}, 404)
 
     location = data['location']
 
     # Add arrival event to history
-    parcels_db[parcel_id]['history'].append({
-        'timestamp': int(time.time()),
-        'message': f"Parcel arrived at {location}"
-    })
+    _add_history(parcels_db[parcel_id], f"Parcel arrived at {location}")
 
-    return jsonify(True), 200
+    return _ojson(True)
 
 
 @app.route('/clear', methods=['POST'])
 def clear_db():
-    global parcels_db
-    global parcels_by_leg
-
-    parcels_db = {}
-    parcels_by_leg = {}
-    return jsonify({}), 200
+    clear_storage()
+    return _ojson({})
 
 
 @app.route('/health', methods=['GET'])
@@ -186,18 +213,18 @@ def health_check():
     """
     Simple health check endpoint.
     """
-    return jsonify({"status": "healthy"}), 200
+    return _ojson({"status": "healthy"})
 
 
 # Error handlers
 @app.errorhandler(404)
 def not_found(error):
-    return jsonify({"detail": "Not found"}), 404
+    return _ojson({"detail": "Not found"}, 404)
 
 
 @app.errorhandler(400)
 def bad_request(error):
-    return jsonify({"detail": "Bad request"}), 400
+    return _ojson({"detail": "Bad request"}, 400)
 
 
 if __name__ == '__main__':
@@ -5,16 +5,15 @@ Tests all endpoints to ensure they match the API contract of the main service.
 
 import hashlib
 import pytest
-from app import app as flask_app
+from app import app as flask_app, clear_storage
 
 
 @pytest.fixture
 def client():
     """Create a test client for the Flask app."""
     flask_app.config['TESTING'] = True
+    clear_storage()
     with flask_app.test_client() as client:
-        response = client.post('/clear')
-        assert response.status_code == 200
         yield client
 
 
@@ -80,6 +79,7 @@ class TestRegisterEndpoint:
         assert response.status_code == 400
         data = response.get_json()
         assert 'detail' in data
+        assert 'weight' in data['detail']
 
     def test_register_parcel_all_fields_present(self, client):
         """Test that all required fields are accepted."""
@@ -350,6 +350,25 @@ class TestHealthEndpoint:
         assert data['status'] == 'healthy'
 
 
+class TestClearEndpoint:
+    """Tests for POST /clear endpoint."""
+
+    def test_clear_removes_parcels(self, client, sample_parcel_data, private_parcel_id):
+        """Test that registered parcels are gone after clearing."""
+        sample_parcel_data['publicId'] = hashlib.sha256(private_parcel_id.encode()).hexdigest()
+        client.post('/register', json=sample_parcel_data, content_type='application/json')
+
+        response = client.post('/clear')
+        assert response.status_code == 200
+
+        response = client.post(
+            '/track',
+            json={"privateParcelId": private_parcel_id},
+            content_type='application/json'
+        )
+        assert response.status_code == 404
+
+
 class TestEndToEndFlow:
     """End-to-end integration tests."""
 
@@ -1,23 +1,25 @@
 """
 Pydantic models for API request and response validation.
 Matches the OpenAPI specification in context/openapi.yaml
+All models are frozen: request input is only read, responses are built once.
 """
 
 from pydantic import BaseModel, Field, ConfigDict
-from typing import List
 
 
 class ItemInfo(BaseModel):
     """Item information in a parcel."""
+    model_config = ConfigDict(frozen=True)
+
     name: str
     value: int
 
 
 class ParcelCreationInfo(BaseModel):
     """Request model for parcel registration."""
-    model_config = ConfigDict(populate_by_name=True)
+    model_config = ConfigDict(populate_by_name=True, frozen=True)
 
-    items: List[ItemInfo]
+    items: list[ItemInfo]
     publicId: str  # Generated and hashed by frontend
     length: int
     width: int
@@ -31,47 +33,66 @@ class ParcelCreationInfo(BaseModel):
 
 class DeliveryInfo(BaseModel):
     """Response model for successful parcel registration."""
+    model_config = ConfigDict(frozen=True)
+
     cost: int
     time: int
 
 
 class PickupInput(BaseModel):
     """Request model for pickup endpoint."""
+    model_config = ConfigDict(frozen=True)
+
     privateParcelId: str
 
 
 class GetDeliveryStatusInput(BaseModel):
     """Request model for tracking endpoint."""
+    model_config = ConfigDict(frozen=True)
+
     privateParcelId: str
 
 
 class HistoryEntry(BaseModel):
     """Single history entry in parcel tracking."""
+    model_config = ConfigDict(frozen=True)
+
     timestamp: int
     message: str
 
 
 class ParcelStatusHistory(BaseModel):
     """Response model for parcel tracking."""
+    model_config = ConfigDict(frozen=True)
+
     totalStops: int
-    history: List[HistoryEntry]
+    history: list[HistoryEntry]
 
 
 class ParcelList(BaseModel):
     """Response model for parcels by leg endpoint."""
-    parcelIds: List[str]
+    model_config = ConfigDict(frozen=True)
+
+    parcelIds: list[str]
 
 
 class LegId(BaseModel):
     """Identifier for a delivery leg."""
+    model_config = ConfigDict(frozen=True)
+
     id: str
 
 
 class TakeParcelInput(BaseModel):
     """Request model for take (departure) endpoint."""
+    model_config = ConfigDict(frozen=True)
+
     leg: LegId
 
 
 class PutParcelInput(BaseModel):
     """Request model for put (arrival) endpoint."""
+    model_config = ConfigDict(frozen=True)
+
     location: str
+
@@ -3,7 +3,9 @@ Router client for parcel management.
 Contains RouterClient for real routing and RouterStubClient for mock routing.
 """
 
-import requests
+import httpx
+import orjson
+from functools import lru_cache
 from typing import Optional, Tuple
 from domain import Route
 
@@ -12,26 +14,34 @@ class RouterClient:
     """
     Real Router service client.
     Communicates with Router service via HTTP on localhost:5000.
+    Lookups are awaited on the event loop over a shared keep-alive pool.
     """
 
+    _HEADERS = {"content-type": "application/json"}
+
     def __init__(self, base_url: str = "http://localhost:5000"):
         self.base_url = base_url
+        self._client = httpx.AsyncClient(
+            base_url=base_url,
+            timeout=5,
+            limits=httpx.Limits(max_connections=64, max_keepalive_connections=64)
+        )
 
-    def get_route(self, from_loc: str, to_loc: str, weight: int, value: int) -> Optional[Route]:
+    async def get_route(self, from_loc: str, to_loc: str, weight: int, value: int) -> Optional[Route]:
         """
         Get a route between two locations from Router service.
         Returns None if no route exists or if service is unavailable.
         """
         try:
-            response = requests.post(
-                f"{self.base_url}/route",
-                json={
+            response = await self._client.post(
+                "/route",
+                content=orjson.dumps({
                     "from": from_loc,
                     "to": to_loc,
                     "weight": weight,
                     "value": value
-                },
-                timeout=5
+                }),
+                headers=self._HEADERS
             )
 
             if response.status_code == 400:
@@ -39,21 +49,25 @@ class RouterClient:
                 return None
 
             response.raise_for_status()
-            data = response.json()
+            data = orjson.loads(response.content)
 
             return Route(
-                leg_ids=[leg['id'] for leg in data["legs"]],
+                leg_ids=tuple(leg['id'] for leg in data["legs"]),
                 cost=data["cost"],
                 time=data["time"]
             )
 
-        except requests.exceptions.RequestException:
+        except httpx.HTTPError:
             # Service unavailable or network error
             return None
-        except (KeyError, ValueError):
+        except (KeyError, TypeError, ValueError):
             # Invalid response format
             return None
 
+    async def aclose(self) -> None:
+        """Close the pooled connections to the Router service."""
+        await self._client.aclose()
+
 
 class RouterStubClient:
     """
@@ -63,12 +77,18 @@ class RouterStubClient:
 
     def __init__(self):
         self._routes = self._create_predefined_routes()
+        # Routes are immutable, so repeat requests can share one Route instance
+        self._cached_route = lru_cache(maxsize=1024)(self._lookup_route)
 
-    def get_route(self, from_loc: str, to_loc: str, weight: int, value: int) -> Optional[Route]:
+    async def get_route(self, from_loc: str, to_loc: str, weight: int, value: int) -> Optional[Route]:
         """
         Get a route between two locations.
         Returns None if no route exists (simulates routing failure).
         """
+        return self._cached_route(from_loc, to_loc, weight, value)
+
+    def _lookup_route(self, from_loc: str, to_loc: str, weight: int, value: int) -> Optional[Route]:
+        """Build the priced route for a request; memoized per stub instance."""
         route_key = (from_loc.lower(), to_loc.lower())
         base_route = self._routes.get(route_key)
 
@@ -78,28 +98,33 @@ class RouterStubClient:
         # Calculate cost based on weight and value
         cost = self._calculate_cost(base_route.cost, weight, value)
 
-        # Return route with calculated cost
+        # Return route with calculated cost (leg_ids tuple is safely shared)
         return Route(
-            leg_ids=base_route.leg_ids.copy(),
+            leg_ids=base_route.leg_ids,
             cost=cost,
             time=base_route.time
         )
 
-    def _calculate_cost(self, base_cost: int, weight: int, value: int) -> int:
-        """Calculate total cost based on base cost, weight, and value."""
-        return int(base_cost + (weight * 10) + (value * 0.01))
+    @staticmethod
+    def _calculate_cost(base_cost: int, weight: int, value: int) -> int:
+        """
+        Calculate total cost based on base cost, weight, and value.
+        The value surcharge is 1% in whole units, truncated like the old
+        int(... + value * 0.01) for non-negative values but without floats.
+        """
+        return base_cost + weight * 10 + value // 100
 
     def _create_predefined_routes(self) -> dict[Tuple[str, str], Route]:
         """Create predefined routes between common locations."""
         return {
-            ("citya", "cityb"): Route(leg_ids=["leg-001"], cost=100, time=60),
-            ("cityb", "citya"): Route(leg_ids=["leg-002"], cost=100, time=60),
-            ("citya", "cityc"): Route(leg_ids=["leg-003", "leg-004"], cost=200, time=120),
-            ("cityc", "citya"): Route(leg_ids=["leg-005", "leg-006"], cost=200, time=120),
-            ("cityb", "cityc"): Route(leg_ids=["leg-007"], cost=150, time=90),
-            ("cityc", "cityb"): Route(leg_ids=["leg-008"], cost=150, time=90),
-            ("citya", "cityd"): Route(leg_ids=["leg-009", "leg-010", "leg-011"], cost=300, time=180),
-            ("cityd", "citya"): Route(leg_ids=["leg-012", "leg-013", "leg-014"], cost=300, time=180),
-            ("newyork", "london"): Route(leg_ids=["leg-015"], cost=500, time=420),
-            ("london", "newyork"): Route(leg_ids=["leg-016"], cost=500, time=420),
+            ("citya", "cityb"): Route(leg_ids=("leg-001",), cost=100, time=60),
+            ("cityb", "citya"): Route(leg_ids=("leg-002",), cost=100, time=60),
+            ("citya", "cityc"): Route(leg_ids=("leg-003", "leg-004"), cost=200, time=120),
+            ("cityc", "citya"): Route(leg_ids=("leg-005", "leg-006"), cost=200, time=120),
+            ("cityb", "cityc"): Route(leg_ids=("leg-007",), cost=150, time=90),
+            ("cityc", "cityb"): Route(leg_ids=("leg-008",), cost=150, time=90),
+            ("citya", "cityd"): Route(leg_ids=("leg-009", "leg-010", "leg-011"), cost=300, time=180),
+            ("cityd", "citya"): Route(leg_ids=("leg-012", "leg-013", "leg-014"), cost=300, time=180),
+            ("newyork", "london"): Route(leg_ids=("leg-015",), cost=500, time=420),
+            ("london", "newyork"): Route(leg_ids=("leg-016",), cost=500, time=420),
         }
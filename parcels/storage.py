@@ -1,23 +1,37 @@
 """
 In-memory storage for parcels with business logic.
-Note: Not thread-safe. For production, add proper locking mechanisms.
+Note: Not thread-safe. The registry is confined to the event loop: every
+endpoint is async and each mutation (index update plus history append) runs
+without awaiting, so no two of them interleave. Calling it from worker
+threads would need locking.
 """
 
+import sys
+from collections import defaultdict
+from operator import attrgetter
 from typing import Optional, List, Tuple
 from domain import Parcel, ParcelHistory, Item
 
 
+_item_value = attrgetter("value")
+
+
 class ParcelRegistry:
     """
     In-memory registry for parcels with business logic.
     Uses public_id (provided by frontend) as the index.
+    Parcel history must be updated through the record_* methods so the
+    leg index stays consistent.
     """
 
     def __init__(self, router_client):
         self._parcels: dict[str, Parcel] = {}
+        # Public IDs of parcels awaiting transport, keyed by their next leg.
+        # Inner dicts act as insertion-ordered sets (values are unused).
+        self._by_leg: defaultdict[str, dict[str, None]] = defaultdict(dict)
         self.router = router_client
 
-    def register_parcel(
+    async def register_parcel(
         self,
         public_id: str,
         from_location: str,
@@ -26,20 +40,26 @@ class ParcelRegistry:
         width: int,
         height: int,
         weight: int,
-        items: List[Item]
+        items: List[Item],
+        now: Optional[int] = None
     ) -> Optional[Tuple[int, int]]:
         """
         Register a new parcel.
         Returns (cost, time) tuple if successful, None if no route found.
+        The record_* methods likewise take an optional `now` epoch timestamp
+        so a caller recording several events can read the clock once.
         """
         # Calculate total value
-        total_value = sum(item.value for item in items)
+        total_value = sum(map(_item_value, items))
 
         # Get route from router service
-        route = self.router.get_route(from_location, to_location, weight, total_value)
+        route = await self.router.get_route(from_location, to_location, weight, total_value)
         if route is None:
             return None
 
+        # Origins repeat across parcels; share one string per location name
+        from_location = sys.intern(from_location)
+
         # Create parcel with empty history
         parcel = Parcel(
             public_id=public_id,
@@ -49,13 +69,17 @@ class ParcelRegistry:
             weight=weight,
             items=items,
             route=route,
+            total_stops=len(route.leg_ids),
             history=ParcelHistory()
         )
-        parcel.history.arrival(from_location)
-        print(f"Legs are {route.leg_ids}")
+        parcel.history.arrival(from_location, now)
 
-        # Store parcel
+        # Store parcel, replacing any previous registration under the same ID
+        previous = self._parcels.get(parcel.public_id)
+        if previous is not None:
+            self._unindex(previous)
         self._parcels[parcel.public_id] = parcel
+        self._index(parcel)
 
         return (route.cost, route.time)
 
@@ -68,10 +92,39 @@ class ParcelRegistry:
         Get list of parcel IDs awaiting transport for a specific leg.
         Returns list of public IDs.
         """
-        result = []
-        for parcel in self._parcels.values():
-            next_leg_id = parcel.get_next_leg_id()
-            if next_leg_id == leg_id:
-                result.append(parcel.public_id)
+        return list(self._by_leg.get(leg_id, ()))
+
+    def record_departure(self, parcel: Parcel, leg_id: str, now: Optional[int] = None) -> None:
+        """Record that a parcel departed on a leg."""
+        self._unindex(parcel)
+        parcel.history.departure(leg_id, now)
+        self._index(parcel)
+
+    def record_arrival(self, parcel: Parcel, location: str, now: Optional[int] = None) -> None:
+        """Record that a parcel arrived at a location."""
+        self._unindex(parcel)
+        parcel.history.arrival(location, now)
+        self._index(parcel)
+
+    def record_pickup(self, parcel: Parcel, now: Optional[int] = None) -> None:
+        """Record that a parcel was picked up at its final destination."""
+        self._unindex(parcel)
+        parcel.history.pickup(now)
+        self._index(parcel)
+
+    def clear(self) -> None:
+        """Remove all parcels from the registry."""
+        self._parcels.clear()
+        self._by_leg.clear()
+
+    def _index(self, parcel: Parcel) -> None:
+        """Add a parcel to the index entry of its next leg, if any."""
+        leg_id = parcel.get_next_leg_id()
+        if leg_id is not None:
+            self._by_leg[leg_id][parcel.public_id] = None
 
-        return result
+    def _unindex(self, parcel: Parcel) -> None:
+        """Remove a parcel from the index entry of its next leg, if any."""
+        leg_id = parcel.get_next_leg_id()
+        if leg_id is not None:
+            self._by_leg[leg_id].pop(parcel.public_id, None)
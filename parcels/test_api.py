@@ -3,36 +3,15 @@ Integration tests for the Parcel Management Service API.
 """
 
 import pytest
-import hashlib
-import uuid
-from fastapi.testclient import TestClient
-from main import app, registry
-from services import RouterStubClient
 
 
-# Test client
-client = TestClient(app)
+# Every test is served from its own fresh registry (see conftest.py)
+pytestmark = pytest.mark.usefixtures("registry")
 
 
-@pytest.fixture(autouse=True)
-def reset_registry():
-    """Clear in-memory storage between tests and use stub router."""
-    # Replace router with stub for testing
-    registry.router = RouterStubClient()
-    registry._parcels.clear()
-    yield
-
-
-def generate_parcel_id():
-    """Generate a UUID and its hash for testing."""
-    private_id = str(uuid.uuid4())
-    public_id = hashlib.sha256(private_id.encode()).hexdigest()
-    return private_id, public_id
-
-
-def test_register_parcel_success():
+def test_register_parcel_success(client, parcel_id):
     """Test successful parcel registration."""
-    private_id, public_id = generate_parcel_id()
+    private_id, public_id = parcel_id
 
     response = client.post("/register", json={
         "from": "CityA",
@@ -57,9 +36,9 @@ def test_register_parcel_success():
     assert data["time"] > 0
 
 
-def test_register_parcel_no_route():
+def test_register_parcel_no_route(client, parcel_id):
     """Test parcel registration with unknown locations (no route)."""
-    private_id, public_id = generate_parcel_id()
+    private_id, public_id = parcel_id
 
     response = client.post("/register", json={
         "from": "UnknownCity",
@@ -76,22 +55,18 @@ def test_register_parcel_no_route():
     assert "No valid route" in response.json()["detail"]
 
 
-def test_pickup_parcel():
-    """Test pickup endpoint."""
-    private_id, public_id = generate_parcel_id()
+@pytest.mark.parametrize("path", ["/register", "/pickup", "/track"])
+@pytest.mark.parametrize("body", [b'\xff\xfe', b'{"publicId": '])
+def test_undecodable_body(client, path, body):
+    """Test that a body that is not valid UTF-8 or JSON is a 422, not a 500."""
+    response = client.post(path, content=body, headers={"content-type": "application/json"})
+    assert response.status_code == 422
+    assert response.json()["detail"][0]["type"] == "json_invalid"
 
-    # First register a parcel
-    reg_response = client.post("/register", json={
-        "from": "CityA",
-        "to": "CityB",
-        "publicId": public_id,
-        "width": 10,
-        "height": 10,
-        "length": 20,
-        "weight": 5,
-        "items": [{"name": "Item", "value": 1000}]
-    })
-    assert reg_response.status_code == 200
+
+def test_pickup_parcel(client, register_parcel):
+    """Test pickup endpoint."""
+    private_id, public_id = register_parcel()
 
     # Pickup the parcel using private (unhashed) ID
     response = client.post("/pickup", json={
@@ -102,7 +77,7 @@ def test_pickup_parcel():
     assert response.json() is True
 
 
-def test_pickup_parcel_not_found():
+def test_pickup_parcel_not_found(client):
     """Test pickup with invalid parcel ID."""
     response = client.post("/pickup", json={
         "privateParcelId": "invalid_id"
@@ -111,22 +86,9 @@ def test_pickup_parcel_not_found():
     assert response.status_code == 404
 
 
-def test_track_parcel():
+def test_track_parcel(client, register_parcel):
     """Test tracking endpoint after registration and pickup."""
-    private_id, public_id = generate_parcel_id()
-
-    # Register parcel
-    reg_response = client.post("/register", json={
-        "from": "CityA",
-        "to": "CityB",
-        "publicId": public_id,
-        "width": 10,
-        "height": 10,
-        "length": 20,
-        "weight": 5,
-        "items": [{"name": "Item", "value": 1000}]
-    })
-    assert reg_response.status_code == 200
+    private_id, public_id = register_parcel()
 
     # Track initially (should be empty)
     track_response = client.post("/track", json={"privateParcelId": private_id})
@@ -146,28 +108,15 @@ def test_track_parcel():
     assert "picked up" in track_data["history"][0]["message"].lower()
 
 
-def test_track_not_found():
+def test_track_not_found(client):
     """Test tracking with invalid parcel ID."""
     response = client.post("/track", json={"privateParcelId": "invalid_id"})
     assert response.status_code == 404
 
 
-def test_parcels_by_leg():
+def test_parcels_by_leg(client, register_parcel):
     """Test getting parcels awaiting transport for a specific leg."""
-    private_id, public_id = generate_parcel_id()
-
-    # Register parcel from CityA to CityC (has 2 legs: leg-003, leg-004)
-    reg_response = client.post("/register", json={
-        "from": "CityA",
-        "to": "CityC",
-        "publicId": public_id,
-        "width": 10,
-        "height": 10,
-        "length": 20,
-        "weight": 5,
-        "items": [{"name": "Item", "value": 1000}]
-    })
-    assert reg_response.status_code == 200
+    private_id, public_id = register_parcel("CityC")
 
     # Check parcels for first leg (leg-003)
     response = client.get("/parcels/leg-003")
@@ -182,22 +131,24 @@ def test_parcels_by_leg():
     assert public_id not in data["parcelIds"]
 
 
-def test_take_and_put_parcel():
-    """Test departure (take) and arrival (put) operations."""
-    private_id, public_id = generate_parcel_id()
+def test_parcels_by_leg_follows_transfers(client, register_parcel):
+    """Test that a parcel moves between leg queues as it departs and arrives."""
+    private_id, public_id = register_parcel("CityC")
 
-    # Register parcel from CityA to CityC (2 legs)
-    reg_response = client.post("/register", json={
-        "from": "CityA",
-        "to": "CityC",
-        "publicId": public_id,
-        "width": 10,
-        "height": 10,
-        "length": 20,
-        "weight": 5,
-        "items": [{"name": "Item", "value": 1000}]
-    })
-    assert reg_response.status_code == 200
+    # In transit on the first leg: not awaiting any leg
+    client.post(f"/take/{public_id}", json={"leg": {"id": "leg-003"}})
+    assert public_id not in client.get("/parcels/leg-003").json()["parcelIds"]
+    assert public_id not in client.get("/parcels/leg-004").json()["parcelIds"]
+
+    # Arrived at the intermediate stop: awaiting the second leg
+    client.post(f"/put/{public_id}", json={"location": "CityX"})
+    assert public_id not in client.get("/parcels/leg-003").json()["parcelIds"]
+    assert public_id in client.get("/parcels/leg-004").json()["parcelIds"]
+
+
+def test_take_and_put_parcel(client, register_parcel):
+    """Test departure (take) and arrival (put) operations."""
+    private_id, public_id = register_parcel("CityC")
 
     # Take parcel on first leg (using public ID in path)
     take_response = client.post(f"/take/{public_id}", json={
@@ -221,22 +172,9 @@ def test_take_and_put_parcel():
     assert "arrived" in track_data["history"][1]["message"].lower()
 
 
-def test_take_wrong_leg():
+def test_take_wrong_leg(client, register_parcel):
     """Test that take validates the leg ID."""
-    private_id, public_id = generate_parcel_id()
-
-    # Register parcel
-    reg_response = client.post("/register", json={
-        "from": "CityA",
-        "to": "CityC",
-        "publicId": public_id,
-        "width": 10,
-        "height": 10,
-        "length": 20,
-        "weight": 5,
-        "items": [{"name": "Item", "value": 1000}]
-    })
-    assert reg_response.status_code == 200
+    private_id, public_id = register_parcel("CityC")
 
     # Try to take with wrong leg ID
     take_response = client.post(f"/take/{public_id}", json={
@@ -245,22 +183,31 @@ def test_take_wrong_leg():
     assert take_response.status_code == 400
 
 
-def test_full_delivery_flow():
-    """Test complete delivery flow from registration to final pickup."""
-    private_id, public_id = generate_parcel_id()
+def test_take_invalid_body(client, parcel_id):
+    """Test that a malformed take request is rejected with a validation error."""
+    private_id, public_id = parcel_id
+
+    response = client.post(f"/take/{public_id}", json={"leg": {}})
+    assert response.status_code == 422
+    assert response.json()["detail"][0]["loc"] == ["body", "leg", "id"]
+
+
+@pytest.mark.parametrize("body", [b'\xff\xfe', b'{"leg": '])
+def test_take_undecodable_body(client, parcel_id, body):
+    """Test that a body that is not valid UTF-8 or JSON is a 422, not a 500."""
+    private_id, public_id = parcel_id
+
+    response = client.post(
+        f"/take/{public_id}", content=body, headers={"content-type": "application/json"}
+    )
+    assert response.status_code == 422
+    assert response.json()["detail"][0]["type"] == "json_invalid"
 
+
+def test_full_delivery_flow(client, register_parcel):
+    """Test complete delivery flow from registration to final pickup."""
     # 1. Register parcel
-    reg_response = client.post("/register", json={
-        "from": "CityA",
-        "to": "CityB",
-        "publicId": public_id,
-        "width": 10,
-        "height": 10,
-        "length": 20,
-        "weight": 5,
-        "items": [{"name": "Item", "value": 1000}]
-    })
-    assert reg_response.status_code == 200
+    private_id, public_id = register_parcel()
 
     # 2. Take parcel on first (only) leg
     take_response = client.post(f"/take/{public_id}", json={
@@ -287,7 +234,26 @@ def test_full_delivery_flow():
     assert track_data["totalStops"] == 1
 
 
-def test_health_check():
+@pytest.mark.parametrize("path, model", [
+    ("/register", "ParcelCreationInfo"),
+    ("/pickup", "PickupInput"),
+    ("/track", "GetDeliveryStatusInput"),
+    ("/take/{parcelId}", "TakeParcelInput"),
+    ("/put/{parcelId}", "PutParcelInput"),
+])
+def test_openapi_request_bodies(client, path, model):
+    """Test that request bodies reference their models and document the 422."""
+    schema = client.get("/openapi.json").json()
+    operation = schema["paths"][path]["post"]
+
+    body_schema = operation["requestBody"]["content"]["application/json"]["schema"]
+    assert body_schema == {"$ref": f"#/components/schemas/{model}"}
+    assert model in schema["components"]["schemas"]
+    assert "HTTPValidationError" in schema["components"]["schemas"]
+    assert "422" in operation["responses"]
+
+
+def test_health_check(client):
     """Test health check endpoint."""
     response = client.get("/health")
     assert response.status_code == 200
@@ -0,0 +1,27 @@
+"""
+Gunicorn configuration for the routing service.
+
+Usage:
+    gunicorn -c gunicorn_conf.py router:app
+
+The router is stateless apart from read-only leg tables, so requests can be
+spread over several processes. The app is preloaded in the master, so the
+legs and routing tables are built once and shared with the forked workers
+copy-on-write. Each worker keeps its own route memo.
+"""
+
+import os
+
+bind = "0.0.0.0:5000"
+
+# /route is CPU-bound, so scale with processes; threads cover slow clients
+workers = max(2, os.cpu_count() or 1)
+worker_class = "gthread"
+threads = 4
+
+preload_app = True
+
+# The parcels service keeps a pooled keep-alive client to /route; hold idle
+# connections open longer than gunicorn's 2 s default so they get reused
+keepalive = 30
+backlog = 2048
@@ -1,40 +1,87 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
 import json
-from typing import Dict, Any, Optional, List
+import os
+from dataclasses import dataclass, field
+from typing import Dict, Any, Optional, List, Tuple
+from bisect import bisect_left
+from functools import lru_cache
+from itertools import count
 import heapq
+import orjson
+
+class OrjsonProvider(DefaultJSONProvider):
+    """
+    JSON provider backed by orjson, used by jsonify() and request.get_json().
+    Falls back to Flask's default provider for what orjson does not cover:
+    keyword arguments such as sort_keys or default, and integers wider than
+    64 bits.
+    """
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        if not kwargs:
+            try:
+                return orjson.dumps(obj).decode()
+            except TypeError:
+                pass
+        return super().dumps(obj, **kwargs)
+    
+    def loads(self, s: str | bytes, **kwargs: Any) -> Any:
+        if not kwargs:
+            try:
+                return orjson.loads(s)
+            except orjson.JSONDecodeError:
+                pass
+        return super().loads(s, **kwargs)
+    
+    def response(self, *args: Any, **kwargs: Any) -> Response:
+        # orjson already produces bytes; skip the str round trip of the base class
+        obj = self._prepare_response_obj(args, kwargs)
+        try:
+            body = orjson.dumps(obj)
+        except TypeError:
+            return super().response(*args, **kwargs)
+        return self._app.response_class(body, mimetype=self.mimetype)
 
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
 CORS(app)  # Enable CORS for all routes
 
 # ============================================
 # Data Models (based on OpenAPI schema)
 # ============================================
 
+@dataclass(frozen=True, slots=True)
 class LegId:
     """Identifier for a delivery leg"""
-    def __init__(self, id: str):
-        self.id = id
+    id: str
+    # Serialized form of to_dict(), encoded once since leg IDs never change
+    encoded: bytes = field(init=False, repr=False, compare=False)
+    
+    def __post_init__(self):
+        object.__setattr__(self, "encoded", app.json.dumps(self.to_dict()).encode())
     
     def to_dict(self) -> Dict[str, Any]:
         return {"id": self.id}
 
+@dataclass(frozen=True, slots=True)
 class Leg:
     """Represents a transportation leg between locations"""
-    def __init__(self, id: str, operator: str, from_location: str, to_location: str, 
-                 max_weight: float, time: int, leg_type: str,  # Added leg_type parameter
-                 base_cost: float, weight_factor: float, 
-                 value_factor: float):
-        self.id = id
-        self.operator = operator
-        self.from_location = from_location
-        self.to_location = to_location
-        self.max_weight = max_weight
-        self.time = time
-        self.leg_type = leg_type  # Can be 'air', 'water', 'road', or 'rail'
-        self.base_cost = base_cost
-        self.weight_factor = weight_factor
-        self.value_factor = value_factor
+    id: str
+    operator: str
+    from_location: str
+    to_location: str
+    max_weight: float
+    time: int
+    leg_type: str  # Can be 'air', 'water', 'road', or 'rail'
+    base_cost: float
+    weight_factor: float
+    value_factor: float
+    # Shared identifier object handed out in every route using this leg
+    leg_id: LegId = field(init=False, repr=False, compare=False)
+    
+    def __post_init__(self):
+        object.__setattr__(self, "leg_id", LegId(self.id))
     
     def cost(self, parcel_weight: float, parcel_value: int) -> float:
         """Calculate the cost for this leg based on parcel weight and value"""
@@ -59,13 +106,13 @@ class Leg:
             "value_factor": self.value_factor
         }
 
+@dataclass(frozen=True, slots=True)
 class ParcelDescription:
     """Description of a parcel for routing purposes"""
-    def __init__(self, from_location: str, to_location: str, weight: float, value: int):
-        self.from_location = from_location
-        self.to_location = to_location
-        self.weight = weight
-        self.value = value
+    from_location: str
+    to_location: str
+    weight: float
+    value: int
     
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> 'ParcelDescription':
@@ -76,12 +123,12 @@ class ParcelDescription:
             value=int(data['value'])
         )
 
+@dataclass(slots=True)
 class LegList:
     """List of legs in a route"""
-    def __init__(self, cost: int, time: int, legs: list[LegId]):
-        self.cost = cost
-        self.time = time
-        self.legs = legs
+    cost: int
+    time: int
+    legs: list[LegId]
     
     def to_dict(self) -> Dict[str, Any]:
         return {
@@ -89,6 +136,11 @@ class LegList:
             "time": self.time,
             "legs": [leg.to_dict() for leg in self.legs]
         }
+    
+    def to_json_bytes(self) -> bytes:
+        """Same document as to_dict(), assembled from the prebuilt leg JSON"""
+        legs = b",".join([leg.encoded for leg in self.legs])
+        return b'{"cost":%d,"time":%d,"legs":[%b]}' % (self.cost, self.time, legs)
 
 # ============================================
 # Constant List of Legs (Updated with types)
@@ -153,12 +205,139 @@ CONSTANT_LEGS = [
     Leg("leg_moscow_hub_rail", "RZD", "Moscow", "Hub_EastEurope", 1500.0, 8, "rail", 100, 0.4, 0.012),
 ]
 
+def build_location_index(legs: List[Leg]) -> Dict[str, List[Leg]]:
+    """Group legs by origin, keeping their relative order"""
+    location_index: Dict[str, List[Leg]] = {}
+    for leg in legs:
+        location_index.setdefault(leg.from_location, []).append(leg)
+    return location_index
+
 # Build location index for faster lookup
-LOCATION_INDEX = {}
-for leg in CONSTANT_LEGS:
-    if leg.from_location not in LOCATION_INDEX:
-        LOCATION_INDEX[leg.from_location] = []
-    LOCATION_INDEX[leg.from_location].append(leg)
+LOCATION_INDEX = build_location_index(CONSTANT_LEGS)
+
+# ============================================
+# Precomputed Network Tables
+# ============================================
+
+class RoutingNetwork:
+    """
+    Lookup tables derived from a fixed set of legs.
+    
+    Leg feasibility only depends on the parcel weight, and only changes at the
+    legs' max_weight values, so weights are grouped into buckets delimited by
+    those thresholds. For every bucket the outgoing legs that can carry its
+    weights, and the set of locations reachable from each origin, are
+    precomputed; impossible requests are rejected without a search and the
+    search itself needs no capacity checks. The cheapest path still depends on
+    both weight and value (each leg has its own weight and value factors), so
+    it is not tabulated; instead searches, with their cost and time totals,
+    are memoized per exact (start, end, weight, value).
+    """
+    def __init__(self, legs: List[Leg], location_index: Dict[str, List[Leg]]):
+        self.legs = legs
+        self.location_index = location_index
+        self.origins = frozenset(location_index)
+        self.destinations = frozenset(leg.to_location for leg in legs)
+        self.locations = sorted(self.origins | self.destinations)
+        self.leg_dicts = [leg.to_dict() for leg in legs]
+        # Legs connecting each (from, to) pair directly, in leg order
+        self.direct_legs: Dict[Tuple[str, str], List[Leg]] = {}
+        for leg in legs:
+            self.direct_legs.setdefault((leg.from_location, leg.to_location), []).append(leg)
+        self.weight_thresholds = sorted({leg.max_weight for leg in legs})
+        self._adjacency = [
+            self._build_adjacency(threshold) for threshold in self.weight_thresholds
+        ]
+        self._reachable = [
+            self._build_reachability(adjacency) for adjacency in self._adjacency
+        ]
+        # Per-instance cache, so it is dropped together with a stale network
+        self.cheapest_route = lru_cache(maxsize=4096)(self._search_route)
+    
+    def weight_bucket(self, weight: float) -> Optional[int]:
+        """Index of the bucket containing weight, or None if no leg can carry it"""
+        bucket = bisect_left(self.weight_thresholds, weight)
+        return bucket if bucket < len(self.weight_thresholds) else None
+    
+    def adjacency(self, weight: float) -> Dict[str, tuple]:
+        """
+        Outgoing legs able to carry weight, per origin, as flat
+        (to_location, base_cost, weight_factor, value_factor, leg) tuples.
+        Empty if no leg can carry the weight.
+        """
+        bucket = self.weight_bucket(weight)
+        return {} if bucket is None else self._adjacency[bucket]
+    
+    def is_reachable(self, start: str, end: str, weight: float) -> bool:
+        """Whether any chain of legs able to carry weight leads from start to end"""
+        bucket = self.weight_bucket(weight)
+        if bucket is None:
+            return False
+        return end in self._reachable[bucket].get(start, ())
+    
+    def _search_route(self, start: str, end: str, weight: float,
+                      value: int) -> Optional[Tuple[int, int, Tuple[LegId, ...]]]:
+        """
+        Uncached cheapest route as (cost, time, leg ids), totalled here so
+        cache hits skip the summation too; immutable, shared between hits
+        """
+        route = RoutingService._find_cheapest_route(start, end, weight, value)
+        if route is None:
+            return None
+        
+        total_cost = 0
+        total_time = 0
+        for leg in route:
+            total_cost += leg.cost(weight, value)
+            total_time += leg.time
+        return int(total_cost), int(total_time), tuple(leg.leg_id for leg in route)
+    
+    def _build_adjacency(self, threshold: float) -> Dict[str, tuple]:
+        """Flat tuples for the legs with max_weight >= threshold, per origin"""
+        return {
+            origin: tuple(
+                (leg.to_location, leg.base_cost, leg.weight_factor,
+                 leg.value_factor, leg)
+                for leg in origin_legs if leg.max_weight >= threshold
+            )
+            for origin, origin_legs in self.location_index.items()
+        }
+    
+    @staticmethod
+    def _build_reachability(adjacency: Dict[str, tuple]) -> Dict[str, frozenset]:
+        """Locations reachable from each origin over the given adjacency"""
+        reachable = {}
+        for origin in adjacency:
+            seen = set()
+            stack = [origin]
+            while stack:
+                location = stack.pop()
+                for entry in adjacency.get(location, ()):
+                    to_location = entry[0]
+                    if to_location not in seen:
+                        seen.add(to_location)
+                        stack.append(to_location)
+            reachable[origin] = frozenset(seen)
+        return reachable
+
+
+_network: Optional[RoutingNetwork] = None
+
+
+def current_network() -> RoutingNetwork:
+    """
+    Return the tables for the current CONSTANT_LEGS / LOCATION_INDEX.
+    Rebuilt whenever either global is rebound (e.g. patched in tests).
+    """
+    global _network
+    network = _network
+    if (network is None or network.legs is not CONSTANT_LEGS or
+            network.location_index is not LOCATION_INDEX):
+        network = _network = RoutingNetwork(CONSTANT_LEGS, LOCATION_INDEX)
+    return network
+
+# Build the tables at import, so preforked server workers inherit them
+current_network()
 
 # ============================================
 # Routing Service with Dijkstra's Algorithm
@@ -189,13 +368,15 @@ class RoutingService:
                 return None
             
             # Check if source and destination exist in our network
-            if (parcel.from_location not in LOCATION_INDEX or 
-                parcel.to_location not in [leg.to_location for leg in CONSTANT_LEGS]):
+            network = current_network()
+            if (parcel.from_location not in network.origins or 
+                parcel.to_location not in network.destinations):
                 app.logger.warning(f"Location not found in network: {parcel.from_location} or {parcel.to_location}")
                 return None
             
-            # Use Dijkstra's algorithm to find the cheapest route
-            route = RoutingService._find_cheapest_route(
+            # Use Dijkstra's algorithm to find the cheapest route (memoized,
+            # together with its total cost and time)
+            route = network.cheapest_route(
                 parcel.from_location, 
                 parcel.to_location, 
                 parcel.weight, 
@@ -205,20 +386,11 @@ class RoutingService:
             if route is None:
                 return None
             
-            # Calculate total cost and time
-            total_cost = 0
-            total_time = 0
-            leg_ids = []
-            
-            for leg in route:
-                total_cost += leg.cost(parcel.weight, parcel.value)
-                total_time += leg.time
-                leg_ids.append(LegId(leg.id))
-            
+            total_cost, total_time, leg_ids = route
             return LegList(
-                cost=int(total_cost),
-                time=int(total_time),
-                legs=leg_ids
+                cost=total_cost,
+                time=total_time,
+                legs=list(leg_ids)
             )
             
         except Exception as e:
@@ -233,71 +405,93 @@ class RoutingService:
         Returns:
             List of legs representing the cheapest route from start to end
         """
-        # Priority queue: (total_cost, current_location, path_legs)
-        pq = []
-        heapq.heappush(pq, (0, start, []))
-
-        if (start == end): return []
+        if start == end:
+            return []
+        
+        # Skip the search when no leg chain can carry this weight to the end;
+        # this also covers origins without any leg able to carry it
+        network = current_network()
+        if not network.is_reachable(start, end, weight):
+            return None
+        
+        # Priority queue: (total_cost, tie_breaker, current_location).
+        # The counter keeps equal-cost entries from comparing locations.
+        counter = count()
+        pq = [(0, next(counter), start)]
+        # Only legs able to carry this weight, so no capacity check per edge
+        adjacency = network.adjacency(weight)
         
-        # Keep track of minimum costs to reach each location
+        # Keep track of minimum costs to reach each location, and the leg used
+        # to get there; the path is rebuilt from these only once at the end
         min_costs = {start: 0}
-        visited = set()
+        parents: Dict[str, Leg] = {}
+        best_end_cost = float('inf')
         
         while pq:
-            current_cost, current_loc, path = heapq.heappop(pq)
+            current_cost, _, current_loc = heapq.heappop(pq)
             
-            # Skip if we've found a better way to this location
-            if current_loc in visited and current_cost > min_costs.get(current_loc, float('inf')):
+            # Skip stale entries superseded by a cheaper way to this location
+            if current_cost > min_costs[current_loc]:
                 continue
             
-            visited.add(current_loc)
-            
             # Check if we've reached the destination
             if current_loc == end:
-                return path
+                return RoutingService._reconstruct_path(parents, start, end)
             
             # Explore neighbors through available legs
-            if current_loc not in LOCATION_INDEX:
-                continue
-            
-            for leg in LOCATION_INDEX[current_loc]:
-                # Skip if parcel is too heavy for this leg
-                if weight > leg.max_weight:
-                    continue
+            for to_loc, base_cost, weight_factor, value_factor, leg in adjacency.get(current_loc, ()):
+                # Same arithmetic as Leg.cost, inlined
+                total_cost = current_cost + (base_cost + weight_factor * weight + value_factor * value)
                 
-                # Calculate cost for this leg
-                leg_cost = leg.cost(weight, value)
-                total_cost = current_cost + leg_cost
+                # Leg costs are non-negative, so nothing at least as expensive
+                # as the best known way to the destination can improve on it
+                if total_cost >= best_end_cost:
+                    continue
                 
                 # Check if this is a better path to the next location
-                if (leg.to_location not in min_costs or 
-                    total_cost < min_costs[leg.to_location]):
-                    
-                    min_costs[leg.to_location] = total_cost
-                    new_path = path + [leg]
-                    heapq.heappush(pq, (total_cost, leg.to_location, new_path))
+                if to_loc not in min_costs or total_cost < min_costs[to_loc]:
+                    min_costs[to_loc] = total_cost
+                    parents[to_loc] = leg
+                    if to_loc == end:
+                        best_end_cost = total_cost
+                    heapq.heappush(pq, (total_cost, next(counter), to_loc))
         
         # No path found
         return None
     
+    @staticmethod
+    def _reconstruct_path(parents: Dict[str, Leg], start: str, end: str) -> List[Leg]:
+        """Walk parent legs back from end to start and return them in travel order"""
+        path = []
+        location = end
+        while location != start:
+            leg = parents[location]
+            path.append(leg)
+            location = leg.from_location
+        path.reverse()
+        return path
+    
     @staticmethod
     def get_all_legs() -> List[Dict[str, Any]]:
-        """Return all available legs (for debugging/monitoring)"""
-        return [leg.to_dict() for leg in CONSTANT_LEGS]
+        """Return all available legs (for debugging/monitoring; shared dicts)"""
+        return current_network().leg_dicts
     
     @staticmethod
     def get_locations() -> List[str]:
-        """Return all unique locations in the network"""
-        locations = set()
-        for leg in CONSTANT_LEGS:
-            locations.add(leg.from_location)
-            locations.add(leg.to_location)
-        return sorted(list(locations))
+        """Return all unique locations in the network (shared sorted list)"""
+        return current_network().locations
 
 # ============================================
 # Route Endpoint
 # ============================================
 
+# Fields a /route body must carry, in the order they are reported missing
+_ROUTE_FIELDS = ('from', 'to', 'weight', 'value')
+
+def _json_response(body: bytes) -> Response:
+    """Response for a body already encoded with app.json, cached or prebuilt"""
+    return app.response_class(body, mimetype=app.json.mimetype)
+
 @app.route('/route', methods=['POST'])
 def route_parcel():
     """
@@ -319,11 +513,16 @@ def route_parcel():
     if not request.is_json:
         return jsonify({"error": "Content-Type must be application/json"}), 400
     
-    data = request.get_json()
+    # None for a malformed or null body; parsed once, not cached
+    data = request.get_json(silent=True, cache=False)
     
     # Validate required fields
-    required_fields = ['from', 'to', 'weight', 'value']
-    missing_fields = [field for field in required_fields if field not in data]
+    if not isinstance(data, dict):
+        return jsonify({
+            "error": "Invalid data format",
+            "message": "Request body must be a JSON object"
+        }), 400
+    missing_fields = [field for field in _ROUTE_FIELDS if field not in data]
     
     if missing_fields:
         return jsonify({
@@ -358,7 +557,7 @@ def route_parcel():
             }), 400
         
         # Return successful response
-        return jsonify(route.to_dict()), 200
+        return _json_response(route.to_json_bytes())
         
     except ValueError as e:
         # Handle data validation errors
@@ -379,20 +578,26 @@ def route_parcel():
 # Additional Endpoints for Debugging/Monitoring
 # ============================================
 
+@lru_cache(maxsize=1)
+def _legs_json(network: RoutingNetwork) -> bytes:
+    """Serialized /legs body; it only changes with the network"""
+    return app.json.dumps({
+        "legs": network.leg_dicts,
+        "count": len(network.legs)
+    }).encode()
+
 @app.route('/legs', methods=['GET'])
 def get_legs():
     """GET endpoint to retrieve all available legs"""
-    return jsonify({
-        "legs": RoutingService.get_all_legs(),
-        "count": len(CONSTANT_LEGS)
-    }), 200
+    return _json_response(_legs_json(current_network()))
 
 @app.route('/locations', methods=['GET'])
 def get_locations():
     """GET endpoint to retrieve all available locations"""
+    locations = RoutingService.get_locations()
     return jsonify({
-        "locations": RoutingService.get_locations(),
-        "count": len(RoutingService.get_locations())
+        "locations": locations,
+        "count": len(locations)
     }), 200
 
 @app.route('/route/debug', methods=['POST'])
@@ -403,17 +608,23 @@ def debug_route():
     if not request.is_json:
         return jsonify({"error": "Content-Type must be application/json"}), 400
     
-    data = request.get_json()
+    # None for a malformed or null body; parsed once, not cached
+    data = request.get_json(silent=True, cache=False)
+    if not isinstance(data, dict):
+        return jsonify({
+            "error": "Invalid data format",
+            "message": "Request body must be a JSON object"
+        }), 400
     
     try:
         parcel = ParcelDescription.from_dict(data)
         
         # Get all possible direct legs
         direct_legs = []
-        for leg in CONSTANT_LEGS:
-            if (leg.from_location == parcel.from_location and 
-                leg.to_location == parcel.to_location and
-                parcel.weight <= leg.max_weight):
+        candidates = current_network().direct_legs.get(
+            (parcel.from_location, parcel.to_location), ())
+        for leg in candidates:
+            if parcel.weight <= leg.max_weight:
                 direct_legs.append({
                     "leg": leg.to_dict(),
                     "cost": leg.cost(parcel.weight, parcel.value),
@@ -444,10 +655,10 @@ def debug_route():
 # Health Check (optional but recommended)
 # ============================================
 
-@app.route('/health', methods=['GET'])
-def health_check():
-    """Simple health check endpoint"""
-    return jsonify({
+@lru_cache(maxsize=1)
+def _health_json(network: RoutingNetwork) -> bytes:
+    """Serialized health body; only the counts vary, and only with the network"""
+    return app.json.dumps({
         "status": "healthy",
         "service": "routing-service",
         "endpoints": [
@@ -457,9 +668,14 @@ def health_check():
             "POST /route/debug",
             "GET /health"
         ],
-        "legs_count": len(CONSTANT_LEGS),
-        "locations_count": len(RoutingService.get_locations())
-    }), 200
+        "legs_count": len(network.legs),
+        "locations_count": len(network.locations)
+    }).encode()
+
+@app.route('/health', methods=['GET'])
+def health_check():
+    """Simple health check endpoint"""
+    return _json_response(_health_json(current_network()))
 
 # ============================================
 # Error Handlers
@@ -484,19 +700,16 @@ def method_not_allowed(error):
 # ============================================
 
 if __name__ == '__main__':
-    # Configuration
-    app.config['JSON_SORT_KEYS'] = False  # Maintain JSON key order
-    app.config['JSONIFY_PRETTYPRINT_REGULAR'] = True
-    
     # Print some startup information
     print(f"Routing Service Started")
     print(f"Available legs: {len(CONSTANT_LEGS)}")
     print(f"Available locations: {len(RoutingService.get_locations())}")
     print(f"Service running on http://0.0.0.0:5000")
     
-    # Start the Flask development server
+    # Start the Flask development server; the reloader and debugger slow
+    # every request, so they are opt-in. For load, use gunicorn_conf.py.
     app.run(
         host='0.0.0.0',
         port=5000,
-        debug=True
+        debug=os.environ.get('FLASK_DEBUG') == '1'
     )
\ No newline at end of file
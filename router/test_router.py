@@ -1,3 +1,4 @@
+import json
 import pytest
 from typing import List, Dict, Any
 from unittest.mock import patch, MagicMock
@@ -11,16 +12,16 @@ import os
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 # Import after path setup
-from router import Leg, ParcelDescription, RoutingService, LegList, LegId
+from router import app, Leg, ParcelDescription, RoutingService, LegList, LegId, build_location_index, current_network
 
 
 # ============================================
 # Fixtures for Testing
 # ============================================
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def sample_legs() -> List[Leg]:
-    """Create a simplified set of legs for testing - ALL AIR TYPE"""
+    """Create a simplified set of legs for testing - ALL AIR TYPE (shared, do not modify)"""
     return [
         Leg("leg_ab", "Operator1", "A", "B", 100.0, 2, "air", 50, 0.5, 0.01),
         Leg("leg_bc", "Operator2", "B", "C", 100.0, 3, "air", 40, 0.4, 0.008),
@@ -39,22 +40,22 @@ def sample_parcel() -> ParcelDescription:
     return ParcelDescription("A", "E", 60.0, 1000)
 
 
+@pytest.fixture(scope="session")
+def sample_location_index(sample_legs) -> Dict[str, List[Leg]]:
+    """Location index for sample_legs, built once (shared, do not modify)"""
+    return build_location_index(sample_legs)
+
+
 @pytest.fixture
-def routing_service_with_custom_legs(sample_legs) -> RoutingService:
+def routing_service_with_custom_legs(sample_legs, sample_location_index) -> RoutingService:
     """Create a routing service with custom legs"""
     # Create a fresh instance and patch the constants
     service = RoutingService()
     
-    # Build location index
-    location_index = {}
-    for leg in sample_legs:
-        if leg.from_location not in location_index:
-            location_index[leg.from_location] = []
-        location_index[leg.from_location].append(leg)
-    
-    # Patch the global constants
+    # Patch the global constants. The same objects are patched in for every
+    # test, so the router keeps its tables for them instead of rebuilding.
     with patch('router.CONSTANT_LEGS', sample_legs):
-        with patch('router.LOCATION_INDEX', location_index):
+        with patch('router.LOCATION_INDEX', sample_location_index):
             yield service
 
 
@@ -190,7 +191,19 @@ class TestRoutingAlgorithm:
         )
         
         assert route is None
-    
+
+    def test_find_cheapest_route_too_heavy_for_path(self, routing_service_with_custom_legs):
+        """Test when the destination is only reachable by legs too weak for the parcel"""
+        # E is reachable from A for light parcels, but only leg_heavy carries 160kg
+        route = routing_service_with_custom_legs._find_cheapest_route("A", "E", 160.0, 100)
+
+        assert route is None
+
+        # Heavier than every leg in the network
+        route = routing_service_with_custom_legs._find_cheapest_route("A", "F", 500.0, 100)
+
+        assert route is None
+
     def test_find_cheapest_route_capacity_limited(self, routing_service_with_custom_legs, sample_legs):
         """Test routing when direct route has insufficient capacity"""
         # Create parcel heavier than leg_ac capacity (50kg)
@@ -224,11 +237,7 @@ class TestRoutingAlgorithm:
         all_legs = sample_legs + extra_legs
         
         # Build location index
-        location_index = {}
-        for leg in all_legs:
-            if leg.from_location not in location_index:
-                location_index[leg.from_location] = []
-            location_index[leg.from_location].append(leg)
+        location_index = build_location_index(all_legs)
         
         # Test with custom setup
         with patch('router.CONSTANT_LEGS', all_legs):
@@ -267,6 +276,13 @@ class TestRoutingServiceIntegration:
         for leg_id in route.legs:
             assert isinstance(leg_id, LegId)
     
+    def test_compute_route_json_bytes(self, routing_service_with_custom_legs, sample_parcel):
+        """Test that the prebuilt JSON encoding matches to_dict"""
+        route = routing_service_with_custom_legs.compute_route(sample_parcel)
+        
+        assert json.loads(route.to_json_bytes()) == route.to_dict()
+        assert json.loads(LegList(0, 0, []).to_json_bytes()) == {"cost": 0, "time": 0, "legs": []}
+    
     def test_compute_route_invalid_parcel(self, routing_service_with_custom_legs):
         """Test route computation with invalid parcel"""
         # Zero weight
@@ -291,42 +307,31 @@ class TestRoutingServiceIntegration:
         route = routing_service_with_custom_legs.compute_route(parcel)
         assert route is None
     
-    def test_compute_route_cost_calculation(self, routing_service_with_custom_legs):
-        """Verify cost calculation is correct in computed route"""
-        parcel = ParcelDescription("A", "E", 60.0, 1000)
-        
+    @pytest.mark.parametrize("parcel", [
+        ParcelDescription("A", "E", 60.0, 1000),
+        ParcelDescription("A", "F", 180.0, 2000),
+        ParcelDescription("A", "D", 50.0, 500),
+    ])
+    def test_compute_route_cost_and_time(self, routing_service_with_custom_legs, parcel):
+        """Verify cost and time in a computed route match its legs"""
         route = routing_service_with_custom_legs.compute_route(parcel)
+        assert route is not None
         
-        if route:  # Route might exist
-            # Manually calculate expected cost
-            expected_route = routing_service_with_custom_legs._find_cheapest_route(
-                "A", "E", parcel.weight, parcel.value
-            )
-            
-            if expected_route:
-                expected_cost = sum(
-                    leg.cost(parcel.weight, parcel.value) 
-                    for leg in expected_route
-                )
-                
-                # Allow small floating point differences
-                assert abs(route.cost - expected_cost) < 0.01
-    
-    def test_compute_route_time_calculation(self, routing_service_with_custom_legs):
-        """Verify time calculation is correct in computed route"""
-        parcel = ParcelDescription("A", "E", 60.0, 1000)
+        # Manually calculate expected cost and time from the same legs
+        expected_route = routing_service_with_custom_legs._find_cheapest_route(
+            parcel.from_location, parcel.to_location, parcel.weight, parcel.value
+        )
+        assert [leg.id for leg in expected_route] == [leg_id.id for leg_id in route.legs]
         
-        route = routing_service_with_custom_legs.compute_route(parcel)
+        expected_cost = sum(
+            leg.cost(parcel.weight, parcel.value) 
+            for leg in expected_route
+        )
+        expected_time = sum(leg.time for leg in expected_route)
         
-        if route:  # Route might exist
-            # Manually calculate expected time
-            expected_route = routing_service_with_custom_legs._find_cheapest_route(
-                "A", "E", parcel.weight, parcel.value
-            )
-            
-            if expected_route:
-                expected_time = sum(leg.time for leg in expected_route)
-                assert route.time == expected_time
+        # Allow small floating point differences
+        assert abs(route.cost - expected_cost) < 0.01
+        assert route.time == expected_time
     
     def test_compute_route_heavy_parcel(self, routing_service_with_custom_legs, sample_legs):
         """Test routing for a heavy parcel that limits options"""
@@ -384,11 +389,7 @@ class TestRoutingEdgeCases:
         ]
         
         # Build location index
-        location_index = {}
-        for leg in cycle_legs:
-            if leg.from_location not in location_index:
-                location_index[leg.from_location] = []
-            location_index[leg.from_location].append(leg)
+        location_index = build_location_index(cycle_legs)
         
         with patch('router.CONSTANT_LEGS', cycle_legs):
             with patch('router.LOCATION_INDEX', location_index):
@@ -411,11 +412,7 @@ class TestRoutingEdgeCases:
         ]
         
         # Build location index
-        location_index = {}
-        for leg in equal_cost_legs:
-            if leg.from_location not in location_index:
-                location_index[leg.from_location] = []
-            location_index[leg.from_location].append(leg)
+        location_index = build_location_index(equal_cost_legs)
         
         with patch('router.CONSTANT_LEGS', equal_cost_legs):
             with patch('router.LOCATION_INDEX', location_index):
@@ -435,6 +432,25 @@ class TestRoutingEdgeCases:
                 # Should return a valid route (either one)
                 assert route is not None
 
+    def test_repeated_route_follows_network_changes(self, routing_service_with_custom_legs):
+        """Test that memoized routes are not reused after the legs change"""
+        parcel = ParcelDescription("A", "B", 10.0, 100)
+
+        first = routing_service_with_custom_legs.compute_route(parcel)
+        second = routing_service_with_custom_legs.compute_route(parcel)
+        assert [leg.id for leg in first.legs] == ["leg_ab"]
+        assert second.to_dict() == first.to_dict()
+
+        replacement_legs = [
+            Leg("leg_ab_new", "Op1", "A", "B", 100.0, 7, "air", 10, 0.1, 0.001),
+        ]
+        with patch('router.CONSTANT_LEGS', replacement_legs):
+            with patch('router.LOCATION_INDEX', {"A": replacement_legs}):
+                route = RoutingService.compute_route(parcel)
+
+                assert [leg.id for leg in route.legs] == ["leg_ab_new"]
+                assert route.time == 7
+
 
 # ============================================
 # Performance Tests
@@ -446,34 +462,33 @@ class TestRoutingPerformance:
     def test_large_network_performance(self):
         """Test routing performance with a large network (all air type)"""
         # Create a larger network (100 legs) - all air type
-        large_network = []
-        for i in range(10):  # 10 locations
-            for j in range(10):
-                if i != j:
-                    leg = Leg(
-                        f"leg_{i}_{j}",
-                        f"Operator_{i}_{j}",
-                        f"City_{i}",
-                        f"City_{j}",
-                        100.0,
-                        abs(i - j) * 2,
-                        "air",  # All air type
-                        50 + abs(i - j) * 10,
-                        0.5,
-                        0.01
-                    )
-                    large_network.append(leg)
+        large_network = [
+            Leg(
+                f"leg_{i}_{j}",
+                f"Operator_{i}_{j}",
+                f"City_{i}",
+                f"City_{j}",
+                100.0,
+                abs(i - j) * 2,
+                "air",  # All air type
+                50 + abs(i - j) * 10,
+                0.5,
+                0.01
+            )
+            for i in range(10)  # 10 locations
+            for j in range(10)
+            if i != j
+        ]
         
         # Build location index
-        location_index = {}
-        for leg in large_network:
-            if leg.from_location not in location_index:
-                location_index[leg.from_location] = []
-            location_index[leg.from_location].append(leg)
+        location_index = build_location_index(large_network)
         
         with patch('router.CONSTANT_LEGS', large_network):
             with patch('router.LOCATION_INDEX', location_index):
                 service = RoutingService()
+                # Build the network tables up front, as the service does at
+                # import, so only the routing itself is timed
+                current_network()
                 
                 import time
                 start_time = time.time()
@@ -529,6 +544,22 @@ def test_routing_service_helper_functions():
     assert all(isinstance(loc, str) for loc in locations)
 
 
+
+# ============================================
+# JSON Provider Tests
+# ============================================
+
+def test_json_provider_fallback():
+    """Test that the orjson provider defers to Flask's default where orjson can't serialize"""
+    # Integers wider than 64 bits are rejected by orjson
+    assert json.loads(app.json.dumps({"value": 2 ** 70})) == {"value": 2 ** 70}
+    assert app.json.dumps({"b": 1, "a": 2}, sort_keys=True) == '{"a": 2, "b": 1}'
+    
+    with app.test_request_context():
+        response = app.json.response({"value": 2 ** 70})
+    assert json.loads(response.get_data()) == {"value": 2 ** 70}
+
+
 if __name__ == "__main__":
     # Run tests directly
     pytest.main([__file__, "-v"])
\ No newline at end of file